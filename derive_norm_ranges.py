@@ -0,0 +1,230 @@
+import argparse
+import hashlib
+import math
+import random
+from multiprocessing import Pool
+
+import yaml
+
+from main import DataLoader
+
+CATEGORIES = ['physical', 'combine', 'college_stats', 'nfl_stats']
+
+class QuantileSketch:
+    """Mergeable streaming quantile sketch (KLL-style compactor hierarchy)."""
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.compactors = [[]]
+        self.size = 0
+        self.max_size = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.rng = random.Random(seed)
+        self._update_max_size()
+
+    def _capacity(self, height):
+        depth = len(self.compactors) - height - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def _update_max_size(self):
+        self.max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _grow(self):
+        self.compactors.append([])
+        self._update_max_size()
+
+    def _compress(self):
+        """Halve the first over-full compactor, promoting every other item a level up."""
+        for height, compactor in enumerate(self.compactors):
+            if len(compactor) >= self._capacity(height):
+                if height + 1 >= len(self.compactors):
+                    self._grow()
+                compactor.sort()
+                leftover = [compactor.pop()] if len(compactor) % 2 else []
+                offset = self.rng.randint(0, 1)
+                self.compactors[height + 1].extend(compactor[offset::2])
+                self.compactors[height] = leftover
+                self.size = sum(len(c) for c in self.compactors)
+                break
+
+    def update(self, value):
+        """Add a single value to the sketch."""
+        self.compactors[0].append(value)
+        self.size += 1
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if self.size >= self.max_size:
+            self._compress()
+
+    def merge(self, other):
+        """Merge another sketch into this one."""
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for height, compactor in enumerate(other.compactors):
+            self.compactors[height].extend(compactor)
+        self.size = sum(len(c) for c in self.compactors)
+        self.count += other.count
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        while self.size >= self.max_size:
+            self._compress()
+        return self
+
+    def quantile(self, q):
+        """Return the approximate value at quantile q (0 <= q <= 1)."""
+        if self.count == 0:
+            return None
+        weighted = sorted(
+            (value, 2 ** height)
+            for height, compactor in enumerate(self.compactors)
+            for value in compactor
+        )
+        total_weight = sum(weight for _, weight in weighted)
+        target = q * total_weight
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+def flatten_stats(stats, prefix=''):
+    """Flatten nested stats into the underscore-joined keys used by PlayerNormalizer."""
+    flat = {}
+    for key, val in stats.items():
+        name = f'{prefix}_{key}' if prefix else str(key)
+        if isinstance(val, dict):
+            flat.update(flatten_stats(val, name))
+        elif isinstance(val, (int, float)) and not isinstance(val, bool):
+            flat[name] = val
+    return flat
+
+def iter_player_stats(player):
+    """Yield (category, flattened stats) for every stat block of a player, one per season."""
+    yield 'physical', flatten_stats(player['physical'])
+    yield 'combine', flatten_stats(player['combine'])
+    for season in player['stats']['college']:
+        if season:
+            yield 'college_stats', flatten_stats(season)
+    for season in player['stats']['nfl']:
+        if season:
+            yield 'nfl_stats', flatten_stats(season)
+
+def iter_players(file_name):
+    """Stream player records from a player store one at a time, without loading the whole file."""
+    with open(file_name, 'r') as file:
+        loader = yaml.SafeLoader(file)
+        try:
+            for event in (yaml.StreamStartEvent, yaml.DocumentStartEvent, yaml.MappingStartEvent):
+                if not loader.check_event(event):
+                    raise ValueError(f"{file_name} is not a player store mapping.")
+                loader.get_event()
+            while not loader.check_event(yaml.MappingEndEvent):
+                key = loader.get_event()
+                if getattr(key, 'value', None) != 'players':
+                    loader.compose_node(None, None)
+                    continue
+                loader.get_event()
+                while not loader.check_event(yaml.SequenceEndEvent):
+                    yield loader.construct_document(loader.compose_node(None, None))
+                loader.get_event()
+        finally:
+            loader.dispose()
+
+def sketch_seed(file_name, category, key):
+    """Derive a stable, distinct sketch seed for each shard and stat."""
+    return int(hashlib.sha256(f'{file_name}:{category}:{key}'.encode()).hexdigest()[:16], 16)
+
+def sketch_shard(file_name, k=200):
+    """Build per-stat quantile sketches for a single player store shard in one streaming pass."""
+    sketches = {category: {} for category in CATEGORIES}
+    for player in iter_players(file_name):
+        for category, stats in iter_player_stats(player):
+            for key, val in stats.items():
+                if key not in sketches[category]:
+                    sketches[category][key] = QuantileSketch(k=k, seed=sketch_seed(file_name, category, key))
+                sketches[category][key].update(val)
+    return sketches
+
+def merge_sketches(shard_sketches):
+    """Merge per-shard sketches into a single set of sketches."""
+    merged = {category: {} for category in CATEGORIES}
+    for sketches in shard_sketches:
+        for category, stat_sketches in sketches.items():
+            for key, sketch in stat_sketches.items():
+                if key in merged[category]:
+                    merged[category][key].merge(sketch)
+                else:
+                    merged[category][key] = sketch
+    return merged
+
+def derive_ranges(sketches, template_ranges, lower=0.02, upper=0.98, include_new=False):
+    """Derive [min, max, direction] ranges from sketches, keeping directions from the template."""
+    ranges = {}
+    for category in CATEGORIES:
+        template = template_ranges.get(category, {})
+        keys = list(template)
+        if include_new:
+            keys += sorted(key for key in sketches[category] if key not in template)
+        ranges[category] = {}
+        for key in keys:
+            sketch = sketches[category].get(key)
+            if sketch is None:
+                if key in template:
+                    ranges[category][key] = list(template[key])
+                continue
+            min_v = round(sketch.quantile(lower), 2)
+            max_v = round(sketch.quantile(upper), 2)
+            if min_v == max_v:
+                min_v, max_v = round(sketch.min, 2), round(sketch.max, 2)
+            if min_v == max_v:
+                if key in template:
+                    print(f"Keeping template range for {category} {key}: no spread in observed values.")
+                    ranges[category][key] = list(template[key])
+                else:
+                    print(f"Skipping {category} {key}: no spread in observed values.")
+                continue
+            direction = template[key][2] if key in template else 1
+            ranges[category][key] = [min_v, max_v, direction]
+    return ranges
+
+def format_value(value):
+    """Format a bound without a trailing .0 for whole numbers."""
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+def write_ranges(ranges, file_name):
+    """Write ranges in the norm_ranges.yaml [min, max, direction] layout."""
+    lines = ['ranges:']
+    for category, stats in ranges.items():
+        lines.append(f'  {category}:')
+        for key, (min_v, max_v, direction) in stats.items():
+            lines.append(f'    {key}: [{format_value(min_v)}, {format_value(max_v)}, {direction}]')
+    with open(file_name, 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Derive normalization ranges from player store shards.')
+    parser.add_argument('shards', nargs='*', default=['cfb.yaml'], help='player store YAML files')
+    parser.add_argument('--template', default='norm_ranges.yaml', help='existing ranges file supplying stats and directions')
+    parser.add_argument('--output', default='norm_ranges.yaml')
+    parser.add_argument('--lower', type=float, default=0.02)
+    parser.add_argument('--upper', type=float, default=0.98)
+    parser.add_argument('--k', type=int, default=200, help='sketch accuracy parameter')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--include-new', action='store_true', help='also emit stats missing from the template')
+    args = parser.parse_args()
+
+    template_ranges = DataLoader(args.template).data['ranges']
+
+    with Pool(args.workers) as pool:
+        shard_sketches = pool.starmap(sketch_shard, [(shard, args.k) for shard in args.shards])
+
+    sketches = merge_sketches(shard_sketches)
+    ranges = derive_ranges(sketches, template_ranges, args.lower, args.upper, args.include_new)
+    write_ranges(ranges, args.output)
+    print(f"Wrote ranges for {sum(len(s) for s in ranges.values())} stats to {args.output}")
@@ -0,0 +1,78 @@
+import argparse
+from functools import partial
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import r2_score
+
+from main import (
+    PlayerDataRefiner,
+    PlayerNormalizer,
+    create_train_test_data,
+    load_players,
+    separate_players,
+    train_regression_model,
+)
+from stage_cache import StageCache, file_digest
+
+def permuted_scores(model, X_test, y_test, column, n_repeats, seed):
+    """Score n_repeats permutations of one column in a single batched predict call."""
+    rng = np.random.default_rng(seed)
+    X = np.asarray(X_test, dtype=float)
+    y = np.asarray(y_test, dtype=float)
+    n_rows = X.shape[0]
+
+    stacked = np.tile(X, (n_repeats, 1))
+    for repeat in range(n_repeats):
+        rows = slice(repeat * n_rows, (repeat + 1) * n_rows)
+        stacked[rows, column] = rng.permutation(X[:, column])
+
+    y_pred = model.predict(pd.DataFrame(stacked, columns=X_test.columns))
+    return [r2_score(y, y_pred[repeat * n_rows:(repeat + 1) * n_rows]) for repeat in range(n_repeats)]
+
+def permutation_importance(model, X_test, y_test, n_repeats=100, seed=0, workers=None):
+    """Compute permutation importance (drop in R2) per feature."""
+    baseline = r2_score(np.asarray(y_test, dtype=float), model.predict(X_test.astype(float)))
+    tasks = [
+        (model, X_test, y_test, column, n_repeats, seed + column)
+        for column in range(X_test.shape[1])
+    ]
+    with Pool(workers) as pool:
+        all_scores = pool.starmap(permuted_scores, tasks)
+
+    drops = baseline - np.array(all_scores)
+    report = pd.DataFrame({
+        'Importance Mean': drops.mean(axis=1),
+        'Importance Std': drops.std(axis=1),
+    }, index=X_test.columns).sort_values('Importance Mean', ascending=False)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Permutation feature importance for the trained model.')
+    parser.add_argument('--repeats', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+
+    norm_range_set = 'norm_ranges.yaml'
+    players_data_set = 'cfb.yaml'
+
+    cache = StageCache(enabled=not args.no_cache)
+
+    players_data = cache.stage('load', load_players, players_data_set, deps=[file_digest(players_data_set)])
+    normalized_players = cache.stage('normalize', PlayerNormalizer(norm_range_set).normalize_players, players_data,
+                                     deps=[file_digest(norm_range_set)])
+    refined_player_data = cache.stage('refine', PlayerDataRefiner().refine_data, normalized_players)
+    separated = cache.stage('separate', separate_players, refined_player_data)
+    split = cache.stage('split', create_train_test_data, separated[0])
+    model = cache.stage('train', train_regression_model, split[0], split[2])
+
+    report = cache.stage(
+        'importance', partial(permutation_importance, workers=args.workers), model, split[1], split[3],
+        n_repeats=args.repeats, seed=args.seed,
+    ).value
+    print("Permutation Feature Importance (drop in R2):")
+    print(report)
@@ -1,3 +1,4 @@
+import argparse
 import yaml
 import pprint
 import pandas as pd
@@ -6,6 +7,7 @@ from sklearn.preprocessing import PolynomialFeatures
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 import matplotlib.pyplot as plt
+from stage_cache import DEFAULT_MAX_BYTES, StageCache, file_digest
 
 class DataLoader:
     def __init__(self, file_name):
@@ -17,6 +19,10 @@ class DataLoader:
         with open(self.file_name, 'r') as file:
             return yaml.safe_load(file)
 
+def load_players(file_name):
+    """Load the list of players from a YAML player store."""
+    return DataLoader(file_name).data['players']
+
 class PlayerNormalizer:
     def __init__(self, norm_range_file):
         self.norm_ranges = DataLoader(norm_range_file).data['ranges']
@@ -180,14 +186,12 @@ def separate_players(refined_player_data, min_routes_run=0):
     players_without_nfl_stats = {}
 
     for player, player_data in refined_player_data.items():
-        pprint.pprint(player_data)
         if 'NFL' in player_data:
             if player_data['NFL RR'] >= min_routes_run:
                 players_with_nfl_stats[player] = player_data
         else:
             players_without_nfl_stats[player] = player_data
 
-    print(len(players_with_nfl_stats))
     return players_with_nfl_stats, players_without_nfl_stats
 
 def create_train_test_data(players_with_nfl_stats, random_state, degree=2):
@@ -250,19 +254,31 @@ def evaluate_model(model, X_test, y_test):
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Project NFL success for college players with a linear model.')
+    parser.add_argument('--no-cache', action='store_true', help='recompute every pipeline stage')
+    parser.add_argument('--cache-size-mb', type=int, default=DEFAULT_MAX_BYTES // 2 ** 20)
+    args = parser.parse_args()
+
     norm_range_set = 'norm_ranges.yaml'
     players_data_set = 'cfb.yaml'
 
-    player_data_loader = DataLoader(players_data_set)
-    players_data = player_data_loader.data['players']
+    cache = StageCache(max_bytes=args.cache_size_mb * 2 ** 20, enabled=not args.no_cache)
+
+    players_data = cache.stage('load', load_players, players_data_set, deps=[file_digest(players_data_set)])
 
     player_normalizer = PlayerNormalizer(norm_range_set)
-    normalized_players = player_normalizer.normalize_players(players_data)
+    normalized_players = cache.stage('normalize', player_normalizer.normalize_players, players_data,
+                                     deps=[file_digest(norm_range_set)])
 
     player_data_refiner = PlayerDataRefiner()
-    refined_player_data = player_data_refiner.refine_data(normalized_players)
+    refined_player_data = cache.stage('refine', player_data_refiner.refine_data, normalized_players)
+
+    separated = cache.stage('separate', separate_players, refined_player_data)
+    players_with_nfl_stats, players_without_nfl_stats = separated.value
 
-    players_with_nfl_stats, players_without_nfl_stats = separate_players(refined_player_data)
+    for player_data in refined_player_data.value.values():
+        pprint.pprint(player_data)
+    print(len(players_with_nfl_stats))
 
     # # Print players with NFL stats
     # print("Players with NFL Stats:")
@@ -292,7 +308,9 @@ if __name__ == '__main__':
     poly = PolynomialFeatures(degree=2, include_bias=False)
 
     # Create training and testing data
-    X_train, X_test, y_train, y_test = create_train_test_data(players_with_nfl_stats, random_state=42, degree=2)
+    X_train, X_test, y_train, y_test = cache.stage(
+        'split', create_train_test_data, separated[0], random_state=42, degree=2
+    ).value
 
     # Train the regression model
     model = train_regression_model(X_train, y_train)
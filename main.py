@@ -1,9 +1,28 @@
+import argparse
 import yaml
 import pprint
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
+from stage_cache import DEFAULT_MAX_BYTES, StageCache, file_digest
+
+# Model features, each the average of the listed normalized inputs (category, key[, subkey]).
+COMPOSITE_INPUTS = {
+    'AVG Phys': [('physical', 'height'), ('physical', 'weight'), ('physical', 'hands'),
+                 ('physical', 'arm'), ('physical', 'span')],
+    'AVG Spd Accl': [('combine', '40yd'), ('combine', '10yd')],
+    'AVG Explsv': [('combine', 'shuttle'), ('combine', 'vertical'), ('combine', 'broad'), ('combine', '3cone')],
+    'Norm RecV': [('college_stats', 'pff', 'recv')],
+    'AVG Ctch': [('physical', 'hands'), ('physical', 'span'), ('college_stats', 'pff', 'drop'),
+                 ('college_stats', 'ctc_pct'), ('college_stats', 'drop_pct')],
+    'NORM YAC': [('college_stats', 'yac_rec')],
+    'NORM_YRR': [('college_stats', 'yds_rr')],
+    'NORM SOS': [('college_stats', 'sos')],
+}
+
+FEATURE_COLUMNS = list(COMPOSITE_INPUTS)
 
 class DataLoader:
     def __init__(self, file_name):
@@ -15,6 +34,20 @@ class DataLoader:
         with open(self.file_name, 'r') as file:
             return yaml.safe_load(file)
 
+def load_players(file_name):
+    """Load the list of players from a YAML player store."""
+    return DataLoader(file_name).data['players']
+
+def round_array(values, digits=2):
+    """Round element-wise with Python's round so results match the scalar path exactly.
+
+    Only distinct values are rounded in Python; grids repeat each axis value many times.
+    """
+    values = np.asarray(values, dtype=float)
+    unique, inverse = np.unique(values, return_inverse=True)
+    rounded = np.array([round(value, digits) for value in unique.tolist()], dtype=float)
+    return rounded[inverse].reshape(values.shape)
+
 class PlayerNormalizer:
     def __init__(self, norm_range_file):
         self.norm_ranges = DataLoader(norm_range_file).data['ranges']
@@ -38,6 +71,18 @@ class PlayerNormalizer:
             #print(f"Normalization ranges for {outer_key} {inner_key} not found.")
             return value
 
+    def normalize_array(self, outer_key, inner_key, values):
+        """Normalize an array of values, matching normalize_value element-wise."""
+        values = np.asarray(values, dtype=float)
+        try:
+            min_v, max_v, direction = self.norm_ranges[outer_key][inner_key]
+        except KeyError:
+            return values
+        res = (values - min_v) / (max_v - min_v)
+        if direction < 0:
+            res = 1 - res
+        return round_array(np.clip(res, 0, 1))
+
     def normalize_stats(self, stats, category):
         """Normalize a dictionary of stats."""
         return {key: self.normalize_value(category, key, val) for key, val in stats.items()}
@@ -93,18 +138,29 @@ class PlayerDataRefiner:
         total_value = sum(weight * elem for weight, elem in lst if elem is not None)
         return round(total_value / total_weight, 2) if total_weight > 0 else None
 
+    @staticmethod
+    def lookup(player_data, path):
+        """Look up a normalized input by its (category, key[, subkey]) path."""
+        value = player_data
+        for key in path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+    def composites(self, player_data):
+        """Compute the model feature composites for one normalized player."""
+        return {
+            column: self.average([self.lookup(player_data, path) for path in inputs])
+            for column, inputs in COMPOSITE_INPUTS.items()
+        }
+
     def refine_data(self, normalized_data):
         """Refine the normalized player data."""
         refined_data = {}
         for player, player_data in normalized_data.items():
-            physical_data = player_data['physical']
-            combine_data = player_data['combine']
-            college_stats_data = player_data['college_stats']
             nfl_data = player_data['nfl_stats']
 
-            avg_physical = self.average(list(physical_data.values()))
-            avg_speed_accel = self.average([combine_data['40yd'], combine_data['10yd']])
-            
             if nfl_data:
                 # nfl_avg = self.weighted_average([
                 #     (2, nfl_data['yds_rr']),
@@ -120,30 +176,7 @@ class PlayerDataRefiner:
             else:
                 nfl_avg = None
 
-            avg_explosive = self.average([
-                combine_data['shuttle'],
-                combine_data['vertical'],
-                combine_data['broad'],
-                combine_data['3cone']
-            ])
-            avg_catching = self.average([
-                physical_data['hands'],
-                physical_data['span'],
-                college_stats_data['pff']['drop'],
-                college_stats_data['ctc_pct'],
-                college_stats_data['drop_pct']
-            ])
-
-            refined_data[player] = {
-                'AVG Phys': avg_physical,
-                "AVG Spd Accl": avg_speed_accel,
-                "AVG Explsv": avg_explosive,
-                "Norm RecV": college_stats_data['pff']['recv'],
-                "AVG Ctch": avg_catching,
-                "NORM YAC": college_stats_data['yac_rec'],
-                "NORM_YRR": college_stats_data['yds_rr'],
-                "NORM SOS": college_stats_data['sos'],
-            }
+            refined_data[player] = self.composites(player_data)
 
             if nfl_data: 
                 refined_data[player].update({
@@ -170,6 +203,28 @@ class PlayerDataRefiner:
             #     })
 
         return refined_data
+
+    @staticmethod
+    def average_arrays(arrays):
+        """Element-wise average of equal-length arrays, excluding NaN values."""
+        stacked = np.vstack(arrays)
+        valid = ~np.isnan(stacked)
+        count = valid.sum(axis=0)
+        total = np.where(valid, stacked, 0).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return round_array(np.where(count > 0, total / np.maximum(count, 1), np.nan))
+
+    def refine_arrays(self, player_data, size):
+        """Vectorized composites for one normalized player whose inputs may be arrays of length size."""
+        def column(value):
+            if value is None:
+                return np.full(size, np.nan)
+            return np.broadcast_to(np.asarray(value, dtype=float), (size,))
+
+        return pd.DataFrame({
+            column_name: self.average_arrays([column(self.lookup(player_data, path)) for path in inputs])
+            for column_name, inputs in COMPOSITE_INPUTS.items()
+        })
     
 
 def separate_players(refined_player_data, min_routes_run=0):
@@ -178,21 +233,19 @@ def separate_players(refined_player_data, min_routes_run=0):
     players_without_nfl_stats = {}
 
     for player, player_data in refined_player_data.items():
-        pprint.pprint(player_data)
         if 'NFL' in player_data:
             if player_data['NFL RR'] >= min_routes_run:
                 players_with_nfl_stats[player] = player_data
         else:
             players_without_nfl_stats[player] = player_data
 
-    print(len(players_with_nfl_stats))
     return players_with_nfl_stats, players_without_nfl_stats
 
 def create_train_test_data(players_with_nfl_stats):
     """Create training and testing data for the regression model."""
     df = pd.DataFrame(players_with_nfl_stats).T
 
-    X = df[['AVG Phys', 'AVG Spd Accl', 'AVG Explsv', 'Norm RecV', 'AVG Ctch', 'NORM YAC', 'NORM_YRR', 'NORM SOS']]
+    X = df[FEATURE_COLUMNS]
     y = df['NFL']
 
     # X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=26)
@@ -209,7 +262,8 @@ def train_regression_model(X_train, y_train):
         min_samples_leaf=5,
         max_bins=10,
         #subsample=1.0,
-        loss="absolute_error"
+        loss="absolute_error",
+        random_state=0
     )
     model.fit(X_train, y_train)
     return model
@@ -218,7 +272,7 @@ def predict_nfl_stats(model, players_without_nfl_stats):
     """Predict NFL stats for players without NFL stats using the regression model."""
     df = pd.DataFrame(players_without_nfl_stats).T
 
-    X = df[['AVG Phys', 'AVG Spd Accl', 'AVG Explsv', 'Norm RecV', 'AVG Ctch', 'NORM YAC', 'NORM_YRR', 'NORM SOS']]
+    X = df[FEATURE_COLUMNS]
 
     predicted_nfl_stats = model.predict(X)
     df['Predicted NFL'] = predicted_nfl_stats
@@ -243,30 +297,42 @@ def evaluate_model(model, X_test, y_test):
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Project NFL success for college players.')
+    parser.add_argument('--no-cache', action='store_true', help='recompute every pipeline stage')
+    parser.add_argument('--cache-size-mb', type=int, default=DEFAULT_MAX_BYTES // 2 ** 20)
+    args = parser.parse_args()
+
     norm_range_set = 'norm_ranges.yaml'
     players_data_set = 'cfb.yaml'
 
-    player_data_loader = DataLoader(players_data_set)
-    players_data = player_data_loader.data['players']
+    cache = StageCache(max_bytes=args.cache_size_mb * 2 ** 20, enabled=not args.no_cache)
+
+    players_data = cache.stage('load', load_players, players_data_set, deps=[file_digest(players_data_set)])
 
     player_normalizer = PlayerNormalizer(norm_range_set)
-    normalized_players = player_normalizer.normalize_players(players_data)
+    normalized_players = cache.stage('normalize', player_normalizer.normalize_players, players_data,
+                                     deps=[file_digest(norm_range_set)])
 
     player_data_refiner = PlayerDataRefiner()
-    refined_player_data = player_data_refiner.refine_data(normalized_players)
+    refined_player_data = cache.stage('refine', player_data_refiner.refine_data, normalized_players)
+
+    separated = cache.stage('separate', separate_players, refined_player_data)
+    players_with_nfl_stats, players_without_nfl_stats = separated.value
 
-    players_with_nfl_stats, players_without_nfl_stats = separate_players(refined_player_data)
+    for player_data in refined_player_data.value.values():
+        pprint.pprint(player_data)
+    print(len(players_with_nfl_stats))
 
     # Print players with NFL stats
     print("Players with NFL Stats:")
     pprint.pprint(players_with_nfl_stats)
     players_with_nfl_stats_df = pd.DataFrame(players_with_nfl_stats).T
-    players_with_nfl_stats_df = players_with_nfl_stats_df[['AVG Phys', 'AVG Spd Accl', 'AVG Explsv', 'Norm RecV', 'AVG Ctch', 'NORM YAC', 'NORM_YRR', 'NORM SOS', 'NFL']]
+    players_with_nfl_stats_df = players_with_nfl_stats_df[FEATURE_COLUMNS + ['NFL']]
     print(players_with_nfl_stats_df)
     print()
 
     # Create training and testing data
-    X_train, X_test, y_train, y_test = create_train_test_data(players_with_nfl_stats)
+    X_train, X_test, y_train, y_test = cache.stage('split', create_train_test_data, separated[0]).value
 
     pprint.pprint(X_train)
 
@@ -0,0 +1,98 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from main import (
+    DataLoader,
+    PlayerDataRefiner,
+    PlayerNormalizer,
+    create_train_test_data,
+    separate_players,
+    train_regression_model,
+)
+
+GRID_CATEGORIES = {
+    'physical': lambda player: player['physical'],
+    'combine': lambda player: player['combine'],
+    'college_stats': lambda player: player['stats']['college'][0],
+}
+
+def expand_grid(grid):
+    """Expand {(category, key): values} into flat arrays, one entry per grid point."""
+    keys = list(grid)
+    mesh = np.meshgrid(*[np.asarray(grid[key], dtype=float) for key in keys], indexing='ij')
+    return {key: axis.ravel() for key, axis in zip(keys, mesh)}
+
+def sensitivity_grid(model, player, grid, normalizer, refiner=None):
+    """Score every point of a what-if grid over a prospect's raw inputs in one predict call.
+
+    grid maps (category, key) pairs, e.g. ('combine', '40yd'), to the raw values to try.
+    Returns one row per grid point with the raw inputs and the predicted NFL score.
+    """
+    refiner = refiner or PlayerDataRefiner()
+    if not grid:
+        raise ValueError("grid must have at least one axis")
+    for category, key in grid:
+        if category not in GRID_CATEGORIES:
+            raise ValueError(f"Unsupported grid category: {category}")
+        stats = GRID_CATEGORIES[category](player)
+        if key not in stats or isinstance(stats[key], dict):
+            raise ValueError(f"Unknown {category} stat: {key}")
+
+    points = expand_grid(grid)
+    size = len(next(iter(points.values())))
+    # Normalize each axis before expanding so only its distinct values are normalized.
+    normalized_points = expand_grid({
+        (category, key): normalizer.normalize_array(category, key, values)
+        for (category, key), values in grid.items()
+    })
+
+    normalized = {}
+    for category, get_stats in GRID_CATEGORIES.items():
+        normalized[category] = normalizer.normalize_stats(get_stats(player), category)
+        for (grid_category, key), values in normalized_points.items():
+            if grid_category == category:
+                normalized[category][key] = values
+
+    X = refiner.refine_arrays(normalized, size)
+
+    table = pd.DataFrame({f'{category} {key}': values for (category, key), values in points.items()})
+    table['Predicted NFL'] = model.predict(X)
+    return table
+
+def find_player(players_data, name):
+    """Find a raw player record by name."""
+    for player in players_data:
+        if player['general']['name'] == name:
+            return player
+    raise KeyError(f"Player {name} not found.")
+
+def parse_grid_arg(value):
+    """Parse a category.key=v1,v2,... command line grid axis."""
+    stat, values = value.split('=', 1)
+    category, key = stat.split('.', 1)
+    return (category, key), [float(v) for v in values.split(',')]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='What-if sensitivity grid for a single prospect.')
+    parser.add_argument('player', help='player name as it appears in cfb.yaml')
+    parser.add_argument('--grid', action='append', type=parse_grid_arg, required=True,
+                        help='grid axis, e.g. combine.40yd=4.45,4.50,4.55')
+    args = parser.parse_args()
+
+    players_data = DataLoader('cfb.yaml').data['players']
+    player_normalizer = PlayerNormalizer('norm_ranges.yaml')
+    player_data_refiner = PlayerDataRefiner()
+
+    normalized_players = player_normalizer.normalize_players(players_data)
+    refined_player_data = player_data_refiner.refine_data(normalized_players)
+    players_with_nfl_stats, _ = separate_players(refined_player_data)
+    X_train, X_test, y_train, y_test = create_train_test_data(players_with_nfl_stats)
+    model = train_regression_model(X_train, y_train)
+
+    table = sensitivity_grid(
+        model, find_player(players_data, args.player), dict(args.grid), player_normalizer, player_data_refiner
+    )
+    print(table.to_string(index=False))
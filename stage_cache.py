@@ -0,0 +1,214 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+
+CACHE_DIR = '.stage_cache'
+DEFAULT_MAX_BYTES = 512 * 2 ** 20
+
+def file_digest(file_name):
+    """Hash the contents of a file."""
+    digest = hashlib.sha256()
+    with open(file_name, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+DATA_TYPES = (str, int, float, bool, tuple, list, dict, set, frozenset, type(None))
+
+def referenced_names(target):
+    """Collect the global names read by a function or by any method of a class."""
+    if inspect.isclass(target):
+        functions = [getattr(member, '__func__', member) for member in vars(target).values()]
+        codes = [function.__code__ for function in functions if inspect.isfunction(function)]
+    else:
+        codes = [target.__code__] if hasattr(target, '__code__') else []
+    names = set()
+    while codes:
+        code = codes.pop()
+        names.update(code.co_names)
+        codes.extend(const for const in code.co_consts if inspect.iscode(const))
+    return names
+
+def _update_code_digest(target, digest, seen):
+    if id(target) in seen:
+        return
+    seen.add(id(target))
+    try:
+        source = inspect.getsource(target)
+    except (OSError, TypeError):
+        source = getattr(target, '__qualname__', repr(target))
+    digest.update(source.encode())
+
+    module = inspect.getmodule(target)
+    module_globals = vars(module) if module else {}
+    for name in sorted(referenced_names(target)):
+        if name not in module_globals:
+            continue
+        value = module_globals[name]
+        if inspect.isfunction(value) or inspect.isclass(value):
+            if value.__module__ == target.__module__:
+                _update_code_digest(value, digest, seen)
+        elif isinstance(value, DATA_TYPES):
+            digest.update(f'{name}={value!r}'.encode())
+
+def code_digest(func):
+    """Hash a stage function's source along with the same-module helpers and data globals it reads.
+
+    Bound methods hash their whole class. Arguments bound with functools.partial are not
+    hashed, so they suit options that do not change the result, such as worker counts.
+    """
+    while isinstance(func, functools.partial):
+        func = func.func
+    target = type(func.__self__) if inspect.ismethod(func) else func
+    digest = hashlib.sha256()
+    _update_code_digest(target, digest, set())
+    return digest.hexdigest()
+
+class StageResult:
+    """Lazily computed stage output, addressed by a hash of its inputs and parameters."""
+
+    def __init__(self, cache, name, func, args, kwargs, deps):
+        self.cache = cache
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+        digest = hashlib.sha256()
+        digest.update(name.encode())
+        digest.update(code_digest(func).encode())
+        for arg in args:
+            digest.update(self._input_key(arg).encode())
+        for key, val in sorted(kwargs.items()):
+            digest.update(f'{key}={self._input_key(val)}'.encode())
+        for dep in deps:
+            digest.update(str(dep).encode())
+        self.key = digest.hexdigest()
+
+    @staticmethod
+    def _input_key(value):
+        if isinstance(value, (StageResult, SelectedResult)):
+            return value.key
+        if isinstance(value, (str, int, float, bool, type(None))):
+            return repr(value)
+        # repr truncates large pandas and numpy objects, so hash the full pickled value.
+        try:
+            return hashlib.sha256(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+        except Exception as error:
+            raise TypeError(f"Stage argument of type {type(value).__name__} cannot be hashed") from error
+
+    @staticmethod
+    def _resolve(value):
+        if isinstance(value, (StageResult, SelectedResult)):
+            return value.value
+        return value
+
+    @property
+    def value(self):
+        if not hasattr(self, '_value'):
+            hit, value = self.cache.load(self.key)
+            if not hit:
+                args = [self._resolve(arg) for arg in self.args]
+                kwargs = {key: self._resolve(val) for key, val in self.kwargs.items()}
+                value = self.func(*args, **kwargs)
+                self.cache.store(self.key, value)
+            self._value = value
+        return self._value
+
+    def __getitem__(self, index):
+        return SelectedResult(self, index)
+
+class SelectedResult:
+    """A single element of a stage output that returns a tuple."""
+
+    def __init__(self, parent, index):
+        self.parent = parent
+        self.index = index
+        self.key = f'{parent.key}[{index!r}]'
+
+    @property
+    def value(self):
+        return self.parent.value[self.index]
+
+class StageCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, enabled=True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+    def stage(self, name, func, *args, deps=(), **kwargs):
+        """Declare a pipeline stage; args may be upstream stage results.
+
+        Positional and keyword arguments are part of the key. Bind run-only options that do not
+        affect the output with functools.partial instead.
+        """
+        return StageResult(self, name, func, args, kwargs, deps)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+
+    def load(self, key):
+        """Return (hit, value) for a key, marking the entry as recently used."""
+        if not self.enabled:
+            return False, None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                value = pickle.load(file)
+        except FileNotFoundError:
+            return False, None
+        except Exception:
+            # Corrupt, or pickled against library versions or classes that no longer match.
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return False, None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another process after the read; the value is still good.
+            pass
+        return True, value
+
+    def store(self, key, value):
+        """Write a stage output and evict least recently used entries over the size cap."""
+        if not self.enabled:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the store fits in max_bytes."""
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith('.pkl'):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, file_name))
+                except FileNotFoundError:
+                    # Another process sharing the store evicted it first.
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, file_name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, file_name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, file_name))
+            except FileNotFoundError:
+                pass
+            total -= size
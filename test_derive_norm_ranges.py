@@ -0,0 +1,95 @@
+import bisect
+import random
+
+import pytest
+import yaml
+
+from derive_norm_ranges import QuantileSketch, derive_ranges, iter_players, write_ranges
+from main import PlayerNormalizer
+
+RANK_TOLERANCE = 0.01
+
+def total_weight(sketch):
+    return sum(len(compactor) * 2 ** height for height, compactor in enumerate(sketch.compactors))
+
+def rank_error(sorted_values, value, q):
+    return abs(bisect.bisect_left(sorted_values, value) / len(sorted_values) - q)
+
+@pytest.fixture(scope='module')
+def sample():
+    rng = random.Random(7)
+    return [rng.expovariate(1) for _ in range(100000)]
+
+def test_weight_is_preserved_by_updates_and_merges(sample):
+    shards = [QuantileSketch(seed=seed) for seed in range(4)]
+    for i, value in enumerate(sample):
+        shards[i % 4].update(value)
+        if i % 9973 == 0:
+            assert total_weight(shards[i % 4]) == shards[i % 4].count
+    for shard in shards:
+        assert total_weight(shard) == shard.count
+
+    merged = shards[0]
+    for shard in shards[1:]:
+        merged.merge(shard)
+        assert total_weight(merged) == merged.count
+    assert merged.count == len(sample)
+
+def test_single_sketch_quantile_ranks(sample):
+    sketch = QuantileSketch()
+    for value in sample:
+        sketch.update(value)
+    sorted_values = sorted(sample)
+    for q in (0.02, 0.5, 0.98):
+        assert rank_error(sorted_values, sketch.quantile(q), q) < RANK_TOLERANCE
+
+def test_merged_shard_quantile_ranks(sample):
+    shards = [QuantileSketch(seed=seed) for seed in range(4)]
+    for i, value in enumerate(sample):
+        shards[i % 4].update(value)
+    merged = shards[0]
+    for shard in shards[1:]:
+        merged.merge(shard)
+    sorted_values = sorted(sample)
+    for q in (0.02, 0.5, 0.98):
+        assert rank_error(sorted_values, merged.quantile(q), q) < RANK_TOLERANCE
+    assert merged.min == sorted_values[0]
+    assert merged.max == sorted_values[-1]
+
+def test_iter_players_matches_full_load():
+    with open('cfb.yaml', 'r') as file:
+        expected = yaml.safe_load(file)['players']
+    assert list(iter_players('cfb.yaml')) == expected
+
+def test_written_ranges_load_through_normalizer(tmp_path):
+    ranges = {
+        'physical': {'height': [65, 78.5, 1]},
+        'combine': {'40yd': [4.2, 4.93, -1]},
+        'college_stats': {},
+        'nfl_stats': {'pff_recv': [45, 92, 1]},
+    }
+    output = tmp_path / 'norm_ranges.yaml'
+    write_ranges(ranges, str(output))
+
+    normalizer = PlayerNormalizer(str(output))
+    assert normalizer.norm_ranges['physical']['height'] == [65, 78.5, 1]
+    assert normalizer.normalize_value('combine', '40yd', 4.2) == 1
+    assert normalizer.normalize_value('nfl_stats', 'pff_recv', 92) == 1
+
+def test_constant_template_stat_keeps_template_range():
+    sketch = QuantileSketch()
+    for _ in range(50):
+        sketch.update(74.0)
+    sketches = {'physical': {'height': sketch}, 'combine': {}, 'college_stats': {}, 'nfl_stats': {}}
+
+    ranges = derive_ranges(sketches, {'physical': {'height': [65, 78, 1]}})
+    assert ranges['physical'] == {'height': [65, 78, 1]}
+
+def test_constant_new_stat_is_skipped():
+    sketch = QuantileSketch()
+    for _ in range(50):
+        sketch.update(3.0)
+    sketches = {'physical': {'reach': sketch}, 'combine': {}, 'college_stats': {}, 'nfl_stats': {}}
+
+    ranges = derive_ranges(sketches, {}, include_new=True)
+    assert ranges['physical'] == {}
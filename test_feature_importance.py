@@ -0,0 +1,50 @@
+from functools import partial
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import r2_score
+from sklearn.tree import DecisionTreeRegressor
+
+from feature_importance import permutation_importance, permuted_scores
+from stage_cache import StageCache
+
+def fitted_model():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({
+        'signal': rng.uniform(size=200),
+        'noise': rng.uniform(size=200),
+        'weak': rng.uniform(size=200),
+    })
+    y = 10 * (X['signal'] > 0.5) + X['weak'] + rng.normal(scale=0.1, size=200)
+    model = DecisionTreeRegressor(max_depth=3, random_state=0).fit(X, y)
+    return model, X, pd.Series(y)
+
+def test_batched_scores_match_per_repeat_loop():
+    model, X, y = fitted_model()
+    n_repeats, seed = 7, 3
+    for column in range(X.shape[1]):
+        rng = np.random.default_rng(seed)
+        expected = []
+        for _ in range(n_repeats):
+            permuted = X.copy()
+            permuted.iloc[:, column] = rng.permutation(X.iloc[:, column].to_numpy())
+            expected.append(r2_score(y, model.predict(permuted)))
+        np.testing.assert_allclose(permuted_scores(model, X, y, column, n_repeats, seed), expected)
+
+def test_unused_feature_has_zero_importance():
+    model, X, y = fitted_model()
+    assert 1 not in set(model.tree_.feature)
+
+    report = permutation_importance(model, X, y, n_repeats=5, workers=2)
+    assert report.loc['noise', 'Importance Mean'] == 0
+    assert report.loc['noise', 'Importance Std'] == 0
+    assert report.index[0] == 'signal'
+
+def test_worker_count_does_not_change_stage_key(tmp_path):
+    model, X, y = fitted_model()
+    cache = StageCache(str(tmp_path))
+    keys = {
+        cache.stage('importance', partial(permutation_importance, workers=workers), model, n_repeats=5).key
+        for workers in (None, 1, 4)
+    }
+    assert len(keys) == 1
@@ -0,0 +1,79 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from main import (
+    FEATURE_COLUMNS,
+    DataLoader,
+    PlayerDataRefiner,
+    PlayerNormalizer,
+    create_train_test_data,
+    round_array,
+    separate_players,
+    train_regression_model,
+)
+from sensitivity import sensitivity_grid
+
+GRID = {
+    ('combine', '40yd'): np.round(np.arange(4.35, 4.66, 0.025), 3),
+    ('combine', '10yd'): [1.485, 1.5, 1.55, 1.615],
+    ('physical', 'weight'): [185, 200, 212.5],
+}
+
+@pytest.fixture(scope='module')
+def pipeline():
+    players_data = DataLoader('cfb.yaml').data['players']
+    normalizer = PlayerNormalizer('norm_ranges.yaml')
+    refiner = PlayerDataRefiner()
+    refined = refiner.refine_data(normalizer.normalize_players(players_data))
+    players_with_nfl_stats, _ = separate_players(refined)
+    X_train, X_test, y_train, y_test = create_train_test_data(players_with_nfl_stats)
+    return players_data, normalizer, refiner, train_regression_model(X_train, y_train)
+
+def scalar_predictions(model, player, table, normalizer, refiner):
+    """Score each grid point through normalize_players -> refine_data, one player dict per point."""
+    rows = []
+    for _, point in table.iterrows():
+        what_if = copy.deepcopy(player)
+        for category, key in GRID:
+            what_if[category][key] = float(point[f'{category} {key}'])
+        name = what_if['general']['name']
+        rows.append(refiner.refine_data(normalizer.normalize_players([what_if]))[name])
+    return model.predict(pd.DataFrame(rows)[FEATURE_COLUMNS].astype(float))
+
+def test_grid_matches_scalar_path_for_every_player(pipeline):
+    players_data, normalizer, refiner, model = pipeline
+    for player in players_data:
+        table = sensitivity_grid(model, player, GRID, normalizer, refiner)
+        expected = scalar_predictions(model, player, table, normalizer, refiner)
+        np.testing.assert_array_equal(table['Predicted NFL'].to_numpy(), expected, err_msg=player['general']['name'])
+
+def test_refine_arrays_matches_refine_data(pipeline):
+    players_data, normalizer, refiner, _ = pipeline
+    normalized = normalizer.normalize_players(players_data)
+    refined = refiner.refine_data(normalized)
+    for name, player_data in normalized.items():
+        vectorized = refiner.refine_arrays(player_data, 1).iloc[0]
+        for column in FEATURE_COLUMNS:
+            expected = refined[name][column]
+            if expected is None:
+                assert np.isnan(vectorized[column]), (name, column)
+            else:
+                assert vectorized[column] == expected, (name, column)
+
+def test_round_array_matches_python_round():
+    values = np.array([0.735, 0.125, 0.005, 1.005, 2.675, np.nan, 0.735, -0.015] * 3)
+    rounded = round_array(values.reshape(4, 6))
+    assert rounded.shape == (4, 6)
+    for value, result in zip(values.tolist(), rounded.ravel().tolist()):
+        if np.isnan(value):
+            assert np.isnan(result)
+        else:
+            assert result == round(value, 2)
+
+def test_empty_grid_is_rejected(pipeline):
+    players_data, normalizer, refiner, model = pipeline
+    with pytest.raises(ValueError, match="at least one axis"):
+        sensitivity_grid(model, players_data[0], {}, normalizer, refiner)
@@ -0,0 +1,164 @@
+import importlib
+import inspect
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+import main
+from stage_cache import StageCache
+
+SCALE = 2
+
+def scaled(values):
+    return [value * SCALE for value in values]
+
+def test_warm_stage_is_a_hit(tmp_path):
+    calls = []
+
+    def build(n):
+        calls.append(n)
+        return list(range(n))
+
+    StageCache(str(tmp_path)).stage('build', build, 3).value
+    assert StageCache(str(tmp_path)).stage('build', build, 3).value == [0, 1, 2]
+    assert calls == [3]
+
+def test_changed_global_is_a_miss(tmp_path, monkeypatch):
+    cache = StageCache(str(tmp_path))
+    assert cache.stage('scale', scaled, [1, 2]).value == [2, 4]
+
+    monkeypatch.setitem(globals(), 'SCALE', 3)
+    assert StageCache(str(tmp_path)).stage('scale', scaled, [1, 2]).value == [3, 6]
+
+def test_changed_feature_columns_changes_split_key(tmp_path, monkeypatch):
+    before = StageCache(str(tmp_path)).stage('split', main.create_train_test_data, {}).key
+    monkeypatch.setattr(main, 'FEATURE_COLUMNS', main.FEATURE_COLUMNS[1:])
+    after = StageCache(str(tmp_path)).stage('split', main.create_train_test_data, {}).key
+    assert before != after
+
+def test_edited_data_loader_changes_load_key(tmp_path, monkeypatch):
+    original_getsource = inspect.getsource
+
+    def edited_getsource(target):
+        source = original_getsource(target)
+        if target is main.DataLoader:
+            source = source.replace('yaml.safe_load(file)', 'yaml.full_load(file)')
+        return source
+
+    before = StageCache(str(tmp_path)).stage('load', main.load_players, 'cfb.yaml').key
+    monkeypatch.setattr(inspect, 'getsource', edited_getsource)
+    after = StageCache(str(tmp_path)).stage('load', main.load_players, 'cfb.yaml').key
+    assert before != after
+
+def test_edited_helper_module_source_changes_key(tmp_path, monkeypatch):
+    module_file = tmp_path / 'stage_helpers.py'
+    source = (
+        "class Loader:\n"
+        "    def load(self, value):\n"
+        "        return {body}\n"
+        "\n"
+        "def run(value):\n"
+        "    return Loader().load(value)\n"
+    )
+    module_file.write_text(source.format(body='value'))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    stage_helpers = importlib.import_module('stage_helpers')
+    cache = StageCache(str(tmp_path / 'cache'))
+    before = cache.stage('run', stage_helpers.run, 1).key
+
+    module_file.write_text(source.format(body='value * 10'))
+    stage_helpers = importlib.reload(stage_helpers)
+    stage = cache.stage('run', stage_helpers.run, 1)
+    assert stage.key != before
+    assert stage.value == 10
+    monkeypatch.delitem(sys.modules, 'stage_helpers')
+
+def test_large_frames_differing_in_one_row_get_distinct_keys(tmp_path):
+    frame = pd.DataFrame({'a': range(1000), 'b': [0.5] * 1000})
+    changed = frame.copy()
+    changed.loc[500, 'b'] = 0.75
+    assert repr(frame) == repr(changed)
+
+    cache = StageCache(str(tmp_path))
+    assert cache.stage('frame', scaled, frame).key != cache.stage('frame', scaled, changed).key
+
+def test_evict_tolerates_entries_removed_concurrently(tmp_path, monkeypatch):
+    cache = StageCache(str(tmp_path))
+    for name in 'abc':
+        cache.stage(name, scaled, [1, 2]).value
+    original_stat = os.stat
+
+    def racing_stat(path, *args, **kwargs):
+        if path.endswith('.pkl'):
+            os.remove(path)
+        return original_stat(path, *args, **kwargs)
+
+    cache.max_bytes = 0
+    monkeypatch.setattr(os, 'stat', racing_stat)
+    try:
+        cache.evict()
+    finally:
+        monkeypatch.undo()
+    assert os.listdir(tmp_path) == []
+
+def test_load_tolerates_entry_removed_after_read(tmp_path, monkeypatch):
+    cache = StageCache(str(tmp_path))
+    stage = cache.stage('scale', scaled, [1])
+    stage.value
+
+    def racing_utime(path, *args, **kwargs):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, 'utime', racing_utime)
+    try:
+        result = cache.load(stage.key)
+    finally:
+        monkeypatch.undo()
+    assert result == (True, [2])
+
+def test_failed_write_leaves_no_temp_file(tmp_path):
+    def unpicklable():
+        return lambda: None
+
+    cache = StageCache(str(tmp_path))
+    with pytest.raises(Exception):
+        cache.stage('bad', unpicklable).value
+    assert os.listdir(tmp_path) == []
+
+def test_unloadable_entry_is_a_miss(tmp_path):
+    cache = StageCache(str(tmp_path))
+    stage = cache.stage('scale', scaled, [1])
+    with open(cache._path(stage.key), 'wb') as file:
+        # References a module that does not exist, like an entry pickled by another library version.
+        file.write(b'cnomodule\nthing\n.')
+
+    assert stage.value == [2]
+    assert StageCache(str(tmp_path)).load(stage.key) == (True, [2])
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = StageCache(str(tmp_path))
+    first = cache.stage('a', scaled, list(range(100)))
+    second = cache.stage('b', scaled, list(range(100)))
+    first.value
+    cache.max_bytes = 2 * os.path.getsize(cache._path(first.key))
+    os.utime(cache._path(first.key), (0, 0))
+    second.value
+    third = cache.stage('c', scaled, list(range(100)))
+    third.value
+
+    assert not os.path.exists(cache._path(first.key))
+    assert os.path.exists(cache._path(second.key))
+    assert os.path.exists(cache._path(third.key))
+
+def test_disabled_cache_always_recomputes(tmp_path):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return 'value'
+
+    StageCache(str(tmp_path)).stage('build', build).value
+    StageCache(str(tmp_path), enabled=False).stage('build', build).value
+    assert calls == [1, 1]